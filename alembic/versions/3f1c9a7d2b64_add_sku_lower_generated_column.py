@@ -0,0 +1,44 @@
+"""Add generated sku_lower column with unique index
+
+Revision ID: 3f1c9a7d2b64
+Revises: 8793f5b13329
+Create Date: 2026-10-14 09:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = '8793f5b13329'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Store the normalized SKU so lookups compare a plain column instead of
+    # evaluating LOWER(sku) against a functional index
+    op.execute(text("""
+        ALTER TABLE products
+        ADD COLUMN sku_lower text GENERATED ALWAYS AS (LOWER(sku)) STORED
+    """))
+    
+    # Replace the functional index with a plain b-tree unique index
+    op.execute(text("DROP INDEX IF EXISTS ix_products_sku_lower"))
+    op.execute(text("""
+        CREATE UNIQUE INDEX ix_products_sku_lower
+        ON products (sku_lower)
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP INDEX IF EXISTS ix_products_sku_lower"))
+    op.execute(text("ALTER TABLE products DROP COLUMN IF EXISTS sku_lower"))
+    
+    # Restore the original case-insensitive functional index
+    op.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_products_sku_lower 
+        ON products (LOWER(sku))
+    """))
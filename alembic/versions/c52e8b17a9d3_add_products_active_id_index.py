@@ -0,0 +1,31 @@
+"""Add composite (active, id) index for product listing
+
+Revision ID: c52e8b17a9d3
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-14 11:40:02.561934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8b17a9d3'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The list endpoint filters on active and orders/pages by id, so one
+    # composite index replaces the single-column active index
+    op.create_index('ix_products_active_id', 'products', ['active', 'id'], unique=False)
+    op.drop_index('ix_products_active', table_name='products')
+    # Duplicate of the primary key index; only slowed down bulk imports
+    op.drop_index('ix_products_id', table_name='products')
+
+
+def downgrade() -> None:
+    op.create_index('ix_products_id', 'products', ['id'], unique=False)
+    op.create_index('ix_products_active', 'products', ['active'], unique=False)
+    op.drop_index('ix_products_active_id', table_name='products')
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, delete, func, or_, and_, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from typing import Optional
 from app.database import get_db
@@ -8,12 +10,76 @@ from app.models.product import Product
 from app.schemas import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, PaginationParams
 )
-from app.utils.webhook_trigger import trigger_webhooks
+from app.utils.webhook_trigger import trigger_webhooks, product_payload
+from app.utils.product_cache import get_cached_product, cache_product, invalidate_product_cache
 import math
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
 
+def _json_response(model: BaseModel) -> Response:
+    """
+    Serialize a response model in one pydantic-core pass.
+    
+    Returning a Response skips FastAPI's validate -> jsonable_encoder -> encode
+    round trip for response_model; the model is already the declared shape.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _sku_key(sku: str) -> str:
+    """
+    Normalize a SKU for comparison against the generated sku_lower column.
+    
+    Must match PostgreSQL's lower(sku) exactly (no stripping: stored SKUs
+    keep their whitespace) so lookups hit the ix_products_sku_lower unique
+    index with a plain bound parameter.
+    """
+    return sku.lower()
+
+
+# Columns needed to build a ProductResponse; selecting these as plain rows
+# skips ORM entity construction on the listing path
+_PRODUCT_RESPONSE_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.sku,
+    Product.description,
+    Product.active,
+    Product.created_at,
+    Product.updated_at,
+)
+
+
+# Hot statements built once at import and executed with bound parameters,
+# so requests skip statement construction and cache-key generation
+_GET_PRODUCT_BY_ID = select(Product).where(Product.id == bindparam("product_id"))
+_SKU_TAKEN_BY_OTHER = select(Product.id).where(
+    and_(
+        Product.sku_lower == bindparam("sku_lower"),
+        Product.id != bindparam("product_id")
+    )
+)
+
+
+def _to_response(product) -> ProductResponse:
+    """
+    Build a ProductResponse from a Product or a row of _PRODUCT_RESPONSE_COLUMNS.
+    
+    Data loaded from the database is already well-typed, so this skips
+    Pydantic validation; user input still goes through ProductCreate/ProductUpdate.
+    """
+    return ProductResponse.model_construct(
+        id=product.id,
+        name=product.name,
+        sku=product.sku,
+        description=product.description,
+        active=product.active,
+        created_at=product.created_at,
+        updated_at=product.updated_at,
+    )
+
+
 @router.get("", response_model=ProductListResponse)
 async def list_products(
     page: int = Query(1, ge=1, description="Page number"),
@@ -22,15 +88,16 @@ async def list_products(
     name: Optional[str] = Query(None, description="Filter by name (partial match)"),
     active: Optional[bool] = Query(None, description="Filter by active status"),
     description: Optional[str] = Query(None, description="Filter by description (partial match)"),
+    cursor: Optional[int] = Query(None, ge=1, description="Return products with id below this (keyset pagination; ignores page)"),
     db: AsyncSession = Depends(get_db)
 ):
     """List products with pagination and filtering."""
     # Build query
-    query = select(Product)
+    query = select(*_PRODUCT_RESPONSE_COLUMNS)
     conditions = []
     
     if sku:
-        conditions.append(func.lower(Product.sku) == func.lower(sku))
+        conditions.append(Product.sku_lower == _sku_key(sku))
     if name:
         conditions.append(Product.name.ilike(f"%{name}%"))
     if active is not None:
@@ -46,93 +113,107 @@ async def list_products(
     if conditions:
         count_query = count_query.where(and_(*conditions))
     
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # Apply pagination. A cursor seeks straight to its position in the
+    # (active, id) / primary key index, while OFFSET has to walk past
+    # every skipped row on deep pages.
+    query = query.order_by(Product.id.desc()).limit(page_size)
+    if cursor is not None:
+        query = query.where(Product.id < cursor)
+    else:
+        query = query.offset((page - 1) * page_size)
     
-    # Apply pagination
-    offset = (page - 1) * page_size
-    query = query.order_by(Product.id.desc()).offset(offset).limit(page_size)
-    
-    # Execute query
+    # Both queries share the request's session (one pooled connection)
+    total = await db.scalar(count_query)
     result = await db.execute(query)
-    products = result.scalars().all()
+    items = [_to_response(row) for row in result]
     
     total_pages = math.ceil(total / page_size) if total > 0 else 0
     
-    return ProductListResponse(
-        items=[ProductResponse.model_validate(p) for p in products],
+    return _json_response(ProductListResponse.model_construct(
+        items=items,
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
-    )
+        total_pages=total_pages,
+        next_cursor=items[-1].id if len(items) == page_size else None
+    ))
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
     """Get a single product by ID."""
-    result = await db.execute(select(Product).where(Product.id == product_id))
+    cached, cache_epoch = await get_cached_product(product_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    result = await db.execute(_GET_PRODUCT_BY_ID, {"product_id": product_id})
     product = result.scalar_one_or_none()
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    return ProductResponse.model_validate(product)
+    response = _json_response(_to_response(product))
+    await cache_product(product_id, response.body, cache_epoch)
+    return response
 
 
 @router.post("", response_model=ProductResponse, status_code=201)
-async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_db)):
+async def create_product(
+    product: ProductCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
     """Create a new product."""
-    # Check for duplicate SKU (case-insensitive)
-    existing = await db.execute(
-        select(Product).where(func.lower(Product.sku) == func.lower(product.sku))
+    # Insert and check for duplicate SKU (case-insensitive) in one round-trip:
+    # ON CONFLICT against the sku_lower unique index returns no row on duplicates
+    stmt = (
+        pg_insert(Product)
+        .values(
+            name=product.name,
+            sku=product.sku,
+            description=product.description,
+            active=product.active
+        )
+        .on_conflict_do_nothing(index_elements=[Product.sku_lower])
+        .returning(Product)
     )
-    if existing.scalar_one_or_none():
+    result = await db.execute(stmt)
+    db_product = result.scalar_one_or_none()
+    
+    if not db_product:
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Product with SKU '{product.sku}' already exists (case-insensitive)"
         )
     
-    # Create product
-    db_product = Product(
-        name=product.name,
-        sku=product.sku,
-        description=product.description,
-        active=product.active
-    )
-    
-    db.add(db_product)
     await db.commit()
-    await db.refresh(db_product)
     
-    # Trigger webhook
-    await trigger_webhooks("product.created", db_product, db)
+    # Trigger webhook after the response is sent
+    background_tasks.add_task(trigger_webhooks, "product.created", product_payload(db_product))
     
-    return ProductResponse.model_validate(db_product)
+    return _to_response(db_product)
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: int,
     product_update: ProductUpdate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Update an existing product."""
-    result = await db.execute(select(Product).where(Product.id == product_id))
+    result = await db.execute(_GET_PRODUCT_BY_ID, {"product_id": product_id})
     db_product = result.scalar_one_or_none()
     
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Check for duplicate SKU if SKU is being updated
-    if product_update.sku and product_update.sku.lower() != db_product.sku.lower():
+    if product_update.sku and _sku_key(product_update.sku) != _sku_key(db_product.sku):
         existing = await db.execute(
-            select(Product).where(
-                and_(
-                    func.lower(Product.sku) == func.lower(product_update.sku),
-                    Product.id != product_id
-                )
-            )
+            _SKU_TAKEN_BY_OTHER,
+            {"sku_lower": _sku_key(product_update.sku), "product_id": product_id}
         )
         if existing.scalar_one_or_none():
             raise HTTPException(
@@ -146,18 +227,43 @@ async def update_product(
         setattr(db_product, field, value)
     
     await db.commit()
+    await invalidate_product_cache()
     await db.refresh(db_product)
+    response = _to_response(db_product)
+    payload = product_payload(db_product)
+    
+    # refresh() opened a new transaction; end it so the pooled connection is
+    # returned now rather than when get_db closes the session, which only
+    # happens after background tasks (webhook delivery) have run
+    await db.close()
     
-    # Trigger webhook
-    await trigger_webhooks("product.updated", db_product, db)
+    # Trigger webhook after the response is sent
+    background_tasks.add_task(trigger_webhooks, "product.updated", payload)
     
-    return ProductResponse.model_validate(db_product)
+    return response
+
+
+@router.delete("/bulk", status_code=200)
+async def bulk_delete_products(db: AsyncSession = Depends(get_db)):
+    """Delete all products. Returns count of deleted products."""
+    # Single DELETE statement; rowcount gives us the count without loading rows
+    result = await db.execute(delete(Product))
+    count = result.rowcount
+    
+    await db.commit()
+    await invalidate_product_cache()
+    
+    return {"message": f"Deleted {count} products", "deleted_count": count}
 
 
 @router.delete("/{product_id}", status_code=204)
-async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_product(
+    product_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
     """Delete a single product."""
-    result = await db.execute(select(Product).where(Product.id == product_id))
+    result = await db.execute(_GET_PRODUCT_BY_ID, {"product_id": product_id})
     product = result.scalar_one_or_none()
     
     if not product:
@@ -165,25 +271,9 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(product)
     await db.commit()
+    await invalidate_product_cache()
     
-    # Trigger webhook
-    await trigger_webhooks("product.deleted", product, db)
+    # Trigger webhook after the response is sent
+    background_tasks.add_task(trigger_webhooks, "product.deleted", product_payload(product))
     
     return None
-
-
-@router.delete("/bulk", status_code=200)
-async def bulk_delete_products(db: AsyncSession = Depends(get_db)):
-    """Delete all products. Returns count of deleted products."""
-    result = await db.execute(select(Product))
-    products = result.scalars().all()
-    
-    count = len(products)
-    
-    for product in products:
-        await db.delete(product)
-    
-    await db.commit()
-    
-    return {"message": f"Deleted {count} products", "deleted_count": count}
-
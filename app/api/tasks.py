@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from app.schemas import TaskProgressResponse
+from typing import Dict, Optional
 from app.tasks.celery_app import celery_app
-from celery.result import GroupResult
+from app.utils.redis_url import normalize_redis_url, redis_ssl_options
+from app.utils.progress_store import (
+    progress_keys, queue_progress_update, queue_progress_read, parse_progress
+)
 import redis
+import redis.asyncio as aioredis
+import asyncio
 import os
-import json
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -12,59 +17,84 @@ load_dotenv()
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+# Maximum number of task IDs accepted by the batch progress endpoint
+MAX_BATCH_TASK_IDS = 100
+
 # Redis connection for progress tracking
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 # Convert to TLS for Upstash
-if redis_url and "upstash.io" in redis_url:
-    redis_url = redis_url.rstrip('/').rstrip('/0').rstrip('/1').rstrip('/2')
-    if redis_url.startswith("redis://"):
-        redis_url = redis_url.replace("redis://", "rediss://", 1)
-redis_client = redis.from_url(redis_url, decode_responses=True, ssl_cert_reqs=None)
+redis_url = normalize_redis_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+redis_options = redis_ssl_options(redis_url)
+redis_client = aioredis.from_url(redis_url, decode_responses=True, **redis_options)
+
+
+async def _read_progress(task_id: str):
+    """Read a task's progress (hash fields and errors) in one round-trip."""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        queue_progress_read(pipe, task_id)
+        fields, errors = await pipe.execute()
+    return parse_progress(task_id, fields, errors)
+
+
+async def _update_progress(task_id: str, **fields):
+    """Set progress hash fields atomically."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        queue_progress_update(pipe, task_id, fields=fields)
+        await pipe.execute()
+
+
+def _revoke_task(celery_task_id: str):
+    """Revoke a running import task (blocking: talks to the broker)."""
+    celery_app.control.revoke(celery_task_id, terminate=True)
+
+
+@router.get("/progress", response_model=Dict[str, Optional[TaskProgressResponse]])
+async def get_task_progress_batch(
+    ids: str = Query(..., description="Comma-separated task IDs")
+):
+    """
+    Get stored progress for several CSV import tasks in one Redis round-trip.
+    
+    Returns a mapping of task ID to progress (null for unknown tasks).
+    """
+    task_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="No task IDs provided")
+    if len(task_ids) > MAX_BATCH_TASK_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many task IDs (maximum {MAX_BATCH_TASK_IDS})"
+        )
+    
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                queue_progress_read(pipe, task_id)
+            values = await pipe.execute()
+        
+        response = {}
+        for i, task_id in enumerate(task_ids):
+            progress = parse_progress(task_id, values[2 * i], values[2 * i + 1])
+            response[task_id] = TaskProgressResponse(**progress) if progress else None
+        return response
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error connecting to Redis: {str(e)}")
 
 
 @router.get("/{task_id}/progress", response_model=TaskProgressResponse)
 async def get_task_progress(task_id: str):
     """Get progress of a CSV import task."""
     try:
-        progress_key = f"task_progress:{task_id}"
-        progress_data = redis_client.get(progress_key)
+        progress = await _read_progress(task_id)
         
-        if not progress_data:
+        if not progress:
             raise HTTPException(status_code=404, detail="Task not found")
         
-        progress = json.loads(progress_data)
-        
-        # Check Celery group status if we have group_id
-        celery_group_id = progress.get("celery_group_id")
-        if celery_group_id:
-            try:
-                group_result = GroupResult.restore(celery_group_id, app=celery_app)
-                if group_result:
-                    # Check if all tasks are complete
-                    if group_result.ready():
-                        if progress["status"] != "completed" and progress["status"] != "cancelled":
-                            progress["status"] = "completed"
-                            progress["progress"] = 100.0
-                            progress["completed_at"] = datetime.utcnow().isoformat()
-                            # Update Redis with final status
-                            redis_client.setex(progress_key, 3600, json.dumps(progress))
-                    elif progress["status"] == "cancelled":
-                        # Task was cancelled
-                        pass
-                    else:
-                        # Still processing - ensure status is processing
-                        if progress["status"] != "cancelled":
-                            progress["status"] = "processing"
-            except Exception as e:
-                # If we can't get group status, use Redis data
-                pass
-        
+        # Imports write their own final status to Redis, so the stored
+        # progress is authoritative; nothing to reconcile with Celery
         return TaskProgressResponse(**progress)
         
     except redis.exceptions.RedisError as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to Redis: {str(e)}")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error parsing progress data")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving task progress: {str(e)}")
 
@@ -73,30 +103,27 @@ async def get_task_progress(task_id: str):
 async def cancel_task(task_id: str):
     """Cancel a running CSV import task."""
     try:
-        progress_key = f"task_progress:{task_id}"
-        progress_data = redis_client.get(progress_key)
+        progress_key, _ = progress_keys(task_id)
+        status, celery_task_id = await redis_client.hmget(progress_key, "status", "celery_task_id")
         
-        if not progress_data:
+        if status is None:
             raise HTTPException(status_code=404, detail="Task not found")
         
-        progress = json.loads(progress_data)
-        
-        if progress["status"] in ["completed", "failed", "cancelled"]:
-            raise HTTPException(status_code=400, detail=f"Task is already {progress['status']}")
+        if status in ["completed", "failed", "cancelled"]:
+            raise HTTPException(status_code=400, detail=f"Task is already {status}")
         
         # Mark as cancelled in Redis
-        progress["status"] = "cancelled"
-        progress["message"] = "Task cancelled by user"
-        progress["completed_at"] = datetime.utcnow().isoformat()
-        redis_client.setex(progress_key, 3600, json.dumps(progress))
+        await _update_progress(
+            task_id,
+            status="cancelled",
+            message="Task cancelled by user",
+            completed_at=datetime.utcnow().isoformat()
+        )
         
-        # Try to revoke Celery tasks
-        celery_group_id = progress.get("celery_group_id")
-        if celery_group_id:
+        # Try to stop the worker running the import (not set for inline imports)
+        if celery_task_id:
             try:
-                group_result = GroupResult.restore(celery_group_id, app=celery_app)
-                if group_result:
-                    group_result.revoke(terminate=True)
+                await asyncio.to_thread(_revoke_task, celery_task_id)
             except Exception:
                 pass  # If we can't revoke, at least mark as cancelled in Redis
         
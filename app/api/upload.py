@@ -2,12 +2,15 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.schemas import UploadResponse
 from app.tasks.csv_chunk_processor import process_csv_file
 from app.tasks.csv_import import process_csv_import_inline, count_csv_rows
+from app.utils.redis_url import normalize_redis_url, redis_ssl_options
+from app.utils.progress_store import new_progress, queue_progress_update
+from app.utils.upload_storage import UPLOAD_BUCKET, store_upload, delete_upload, is_remote
+import asyncio
 import os
 import uuid
-import redis
-import json
+import tempfile
+import redis.asyncio as aioredis
 import logging
-from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,9 +20,29 @@ router = APIRouter(prefix="/api/upload", tags=["upload"])
 # Maximum file size: 500MB
 MAX_FILE_SIZE = 500 * 1024 * 1024
 
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_READ_SIZE = 1024 * 1024
+
+# Directory uploaded CSV files are streamed to. Without UPLOAD_BUCKET the worker
+# reads the file from this path, so web and worker must share the filesystem.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", tempfile.gettempdir())
+
 # Threshold under which we process synchronously (bypass Celery)
 INLINE_ROW_THRESHOLD = int(os.getenv("INLINE_ROW_THRESHOLD", "100"))
 
+# Redis connection for progress tracking (shared pool, created once at import)
+# Convert to TLS for Upstash
+redis_url = normalize_redis_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+redis_options = redis_ssl_options(redis_url)
+redis_client = aioredis.from_url(redis_url, decode_responses=True, max_connections=32, **redis_options)
+
+
+async def _mark_failed(task_id: str, message: str):
+    """Record a task as failed before it ever reached a worker."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        queue_progress_update(pipe, task_id, fields={"status": "failed", "message": message})
+        await pipe.execute()
+
 
 @router.post("", response_model=UploadResponse, status_code=202)
 async def upload_csv(
@@ -42,101 +65,117 @@ async def upload_csv(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV file")
     
-    # Read file content (this is fast for most files, but for very large files
-    # we could stream directly to a temp file and pass the path)
-    content = await file.read()
-    
-    # Validate file size
-    file_size = len(content)
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size ({file_size / 1024 / 1024:.2f}MB) exceeds maximum allowed size (500MB)"
-        )
-    
-    if file_size == 0:
-        raise HTTPException(status_code=400, detail="File is empty")
-    
-    # Generate task ID
-    task_id = str(uuid.uuid4())
-    
-    # Pre-count rows (stop early once threshold is exceeded)
-    detected_rows = None
+    # Stream the upload to disk, enforcing the size limit as we go, so memory
+    # use stays flat regardless of file size
+    file_size = 0
+    tmp_file = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, prefix="upload_", suffix=".csv", delete=False)
+    file_path = tmp_file.name
+    # What the worker is given: the local path, or a gs:// reference once stored
+    file_ref = file_path
+    # Set once an import owns the file (it removes it when done); until then
+    # any failure below must not leave the upload behind on disk
+    handed_off = False
     try:
-        detected_rows = count_csv_rows(content, stop_after=INLINE_ROW_THRESHOLD)
-    except Exception as e:
-        logging.warning(f"Failed to pre-count CSV rows: {e}")
-    
-    # Store initial progress in Redis
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    # Convert to TLS for Upstash
-    if redis_url and "upstash.io" in redis_url:
-        redis_url = redis_url.rstrip('/').rstrip('/0').rstrip('/1').rstrip('/2')
-        if redis_url.startswith("redis://"):
-            redis_url = redis_url.replace("redis://", "rediss://", 1)
-    redis_client = redis.from_url(redis_url, decode_responses=True, ssl_cert_reqs=None)
-    progress_key = f"task_progress:{task_id}"
-    initial_progress = {
-        "task_id": task_id,
-        "status": "pending",
-        "progress": 0.0,
-        "total_rows": 0,
-        "processed_rows": 0,
-        "successful_rows": 0,
-        "failed_rows": 0,
-        "errors": [],
-        "created_at": datetime.utcnow().isoformat(),
-        "message": "File uploaded. Starting processing..."
-    }
-    if detected_rows is not None:
-        initial_progress["total_rows"] = detected_rows
-    redis_client.setex(progress_key, 3600, json.dumps(initial_progress))
-    
-    # For small files, process inline to avoid queue overhead
-    if detected_rows is not None and detected_rows <= INLINE_ROW_THRESHOLD:
-        logging.info(
-            "Processing task %s inline (rows=%s <= threshold=%s)",
+        with tmp_file:
+            while chunk := await file.read(UPLOAD_READ_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="File size exceeds maximum allowed size (500MB)"
+                    )
+                # Disk writes block; keep them off the event loop
+                await asyncio.to_thread(tmp_file.write, chunk)
+        
+        if file_size == 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+        
+        # Generate task ID
+        task_id = str(uuid.uuid4())
+        
+        # Pre-count rows (stop early once threshold is exceeded)
+        detected_rows = None
+        try:
+            detected_rows = count_csv_rows(file_path, stop_after=INLINE_ROW_THRESHOLD)
+        except Exception as e:
+            logging.warning(f"Failed to pre-count CSV rows: {e}")
+        
+        # Store initial progress in Redis
+        initial_progress = new_progress(
             task_id,
-            detected_rows,
-            INLINE_ROW_THRESHOLD,
-        )
-        process_csv_import_inline(task_id, content, file.filename)
-        return UploadResponse(
-            task_id=task_id,
-            message="File processed instantly (inline).",
-            filename=file.filename
-        )
-    
-    # Enqueue processing task (all heavy work happens in Celery worker)
-    # This returns immediately, avoiding timeout issues
-    from app.tasks.celery_app import celery_app
-    
-    try:
-        # Use send_task - it should use the broker_transport_options from celery_app.conf
-        # The SSL options are configured in celery_app, so connections should use them
-        result = celery_app.send_task(
-            'app.tasks.csv_import.process_csv_import',
-            args=(task_id, content, file.filename),
-            ignore_result=True  # We use Redis for progress tracking, not Celery results
+            status="pending",
+            total_rows=detected_rows or 0,
+            message="File uploaded. Starting processing..."
         )
-        logging.info(f"Task enqueued successfully: {result.id}")
-    except Exception as e:
-        # If send_task fails, try the regular delay method as fallback
-        logging.warning(f"send_task failed, trying delay: {str(e)}")
+        async with redis_client.pipeline(transaction=True) as pipe:
+            queue_progress_update(pipe, task_id, fields=initial_progress)
+            await pipe.execute()
+        
+        # For small files, process inline to avoid queue overhead
+        if detected_rows is not None and detected_rows <= INLINE_ROW_THRESHOLD:
+            logging.info(
+                "Processing task %s inline (rows=%s <= threshold=%s)",
+                task_id,
+                detected_rows,
+                INLINE_ROW_THRESHOLD,
+            )
+            handed_off = True
+            process_csv_import_inline(task_id, file_path, file.filename)
+            return UploadResponse(
+                task_id=task_id,
+                message="File processed instantly (inline).",
+                filename=file.filename
+            )
+        
+        # Hand the file to the worker through object storage when configured (web
+        # and worker are separate services); the worker deletes the object when
+        # the import ends
+        if UPLOAD_BUCKET:
+            try:
+                file_ref = await asyncio.to_thread(store_upload, file_path, f"uploads/{task_id}.csv")
+            except Exception as e:
+                logging.error(f"Failed to store upload: {str(e)}")
+                await _mark_failed(task_id, f"Failed to store upload: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to start processing. Please try again."
+                )
+        
+        # Enqueue processing task (all heavy work happens in Celery worker)
+        # This returns immediately, avoiding timeout issues
+        from app.tasks.celery_app import celery_app
+        
         try:
-            result = process_csv_file.delay(task_id, content, file.filename)
-            logging.info(f"Task enqueued via delay: {result.id}")
-        except Exception as e2:
-            # If both fail, update progress to show error
-            logging.error(f"Failed to enqueue task: {str(e2)}")
-            error_progress = initial_progress.copy()
-            error_progress["status"] = "failed"
-            error_progress["message"] = f"Failed to enqueue task: {str(e2)}"
-            redis_client.setex(progress_key, 3600, json.dumps(error_progress))
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to start processing. Please try again."
+            # Use send_task - it should use the broker_transport_options from celery_app.conf
+            # The SSL options are configured in celery_app, so connections should use them
+            result = celery_app.send_task(
+                'app.tasks.csv_import.process_csv_import',
+                args=(task_id, file_ref, file.filename),
+                ignore_result=True  # We use Redis for progress tracking, not Celery results
             )
+            handed_off = True
+            logging.info(f"Task enqueued successfully: {result.id}")
+        except Exception as e:
+            # If send_task fails, try the regular delay method as fallback
+            logging.warning(f"send_task failed, trying delay: {str(e)}")
+            try:
+                result = process_csv_file.delay(task_id, file_ref, file.filename)
+                handed_off = True
+                logging.info(f"Task enqueued via delay: {result.id}")
+            except Exception as e2:
+                # If both fail, update progress to show error
+                logging.error(f"Failed to enqueue task: {str(e2)}")
+                await _mark_failed(task_id, f"Failed to enqueue task: {str(e2)}")
+                if is_remote(file_ref):
+                    await asyncio.to_thread(delete_upload, file_ref)
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to start processing. Please try again."
+                )
+    finally:
+        # A stored upload is read from the bucket, so the local copy always goes
+        if not handed_off or is_remote(file_ref):
+            os.remove(file_path)
     
     return UploadResponse(
         task_id=task_id,
@@ -1,20 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 from typing import List
 from app.database import get_db
 from app.models.webhook import Webhook
 from app.schemas import WebhookCreate, WebhookUpdate, WebhookResponse
-from app.utils.webhook_trigger import test_webhook
+from app.utils.webhook_trigger import test_webhook, invalidate_webhook_cache
 import httpx
 
 router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
 
+# Built once at import and executed with a bound webhook_id
+_GET_WEBHOOK_BY_ID = select(Webhook).where(Webhook.id == bindparam("webhook_id"))
+_LIST_WEBHOOKS = select(Webhook).order_by(Webhook.id.desc())
+
 
 @router.get("", response_model=List[WebhookResponse])
 async def list_webhooks(db: AsyncSession = Depends(get_db)):
     """List all webhooks."""
-    result = await db.execute(select(Webhook).order_by(Webhook.id.desc()))
+    result = await db.execute(_LIST_WEBHOOKS)
     webhooks = result.scalars().all()
     return [WebhookResponse.model_validate(w) for w in webhooks]
 
@@ -30,6 +34,7 @@ async def create_webhook(webhook: WebhookCreate, db: AsyncSession = Depends(get_
     
     db.add(db_webhook)
     await db.commit()
+    await invalidate_webhook_cache()
     await db.refresh(db_webhook)
     
     return WebhookResponse.model_validate(db_webhook)
@@ -38,7 +43,7 @@ async def create_webhook(webhook: WebhookCreate, db: AsyncSession = Depends(get_
 @router.get("/{webhook_id}", response_model=WebhookResponse)
 async def get_webhook(webhook_id: int, db: AsyncSession = Depends(get_db)):
     """Get a single webhook by ID."""
-    result = await db.execute(select(Webhook).where(Webhook.id == webhook_id))
+    result = await db.execute(_GET_WEBHOOK_BY_ID, {"webhook_id": webhook_id})
     webhook = result.scalar_one_or_none()
     
     if not webhook:
@@ -54,7 +59,7 @@ async def update_webhook(
     db: AsyncSession = Depends(get_db)
 ):
     """Update an existing webhook."""
-    result = await db.execute(select(Webhook).where(Webhook.id == webhook_id))
+    result = await db.execute(_GET_WEBHOOK_BY_ID, {"webhook_id": webhook_id})
     db_webhook = result.scalar_one_or_none()
     
     if not db_webhook:
@@ -66,6 +71,7 @@ async def update_webhook(
         setattr(db_webhook, field, value)
     
     await db.commit()
+    await invalidate_webhook_cache()
     await db.refresh(db_webhook)
     
     return WebhookResponse.model_validate(db_webhook)
@@ -74,7 +80,7 @@ async def update_webhook(
 @router.delete("/{webhook_id}", status_code=204)
 async def delete_webhook(webhook_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a webhook."""
-    result = await db.execute(select(Webhook).where(Webhook.id == webhook_id))
+    result = await db.execute(_GET_WEBHOOK_BY_ID, {"webhook_id": webhook_id})
     webhook = result.scalar_one_or_none()
     
     if not webhook:
@@ -82,6 +88,7 @@ async def delete_webhook(webhook_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(webhook)
     await db.commit()
+    await invalidate_webhook_cache()
     
     return None
 
@@ -89,7 +96,7 @@ async def delete_webhook(webhook_id: int, db: AsyncSession = Depends(get_db)):
 @router.post("/{webhook_id}/test", status_code=200)
 async def test_webhook_endpoint(webhook_id: int, db: AsyncSession = Depends(get_db)):
     """Test a webhook by sending a test event."""
-    result = await db.execute(select(Webhook).where(Webhook.id == webhook_id))
+    result = await db.execute(_GET_WEBHOOK_BY_ID, {"webhook_id": webhook_id})
     webhook = result.scalar_one_or_none()
     
     if not webhook:
@@ -98,6 +105,10 @@ async def test_webhook_endpoint(webhook_id: int, db: AsyncSession = Depends(get_
     if not webhook.enabled:
         raise HTTPException(status_code=400, detail="Webhook is disabled")
     
+    # Return the pooled connection before the outbound HTTP call (up to the
+    # client timeout); the loaded webhook stays usable after close
+    await db.close()
+    
     # Test the webhook
     try:
         result = await test_webhook(webhook, {"event": "test", "message": "This is a test webhook"})
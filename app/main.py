@@ -1,34 +1,105 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import ORJSONResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.templating import Jinja2Templates
-from app.database import async_engine, Base
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from app.database import async_engine, Base, DB_POOL_SIZE
 from app.api import products, upload, tasks, webhooks
+from app.utils import webhook_trigger
+import asyncio
+import jinja2
+import logging
+import orjson
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Connections opened at startup so early requests skip connect/TLS/auth
+DB_POOL_PREWARM = min(int(os.getenv("DB_POOL_PREWARM", "5")), DB_POOL_SIZE)
+
+
+async def _warm_connection():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables (in production, use Alembic migrations instead)
+    # async with async_engine.begin() as conn:
+    #     await conn.run_sync(Base.metadata.create_all)
+    
+    # Compile templates now instead of on the first page view in each worker
+    for name in templates.env.list_templates():
+        templates.get_template(name)
+    
+    # Open the connections concurrently so they are all checked out at once
+    # and returned to the pool together, rather than reusing a single one
+    try:
+        await asyncio.gather(*(_warm_connection() for _ in range(DB_POOL_PREWARM)))
+    except Exception as exc:
+        # The app still starts (e.g. /health) if the database is not reachable yet
+        logger.warning("Database pool pre-warm failed: %s", exc)
+    
+    yield
+    
+    await webhook_trigger.aclose()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title="Product Importer API",
     description="API for importing and managing products from CSV files",
     version="1.0.0",
+    default_response_class=ORJSONResponse,  # orjson encodes straight to bytes in C
+    lifespan=lifespan,
 )
 
+# Browser cache lifetime for /static assets (seconds); after it expires the
+# ETag/Last-Modified headers StaticFiles already sends turn refetches into 304s
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers reuse assets without asking the server."""
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}"
+        return response
+
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Templates
-templates = Jinja2Templates(directory="templates")
+# Compiled templates are cached as bytecode on disk (shared by all workers)
+# and never re-checked for changes; set TEMPLATES_AUTO_RELOAD=1 when editing them
+templates = Jinja2Templates(
+    directory="templates",
+    auto_reload=os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1",
+    bytecode_cache=jinja2.FileSystemBytecodeCache(tempfile.gettempdir()),
+)
 
 # CORS middleware
+# CORS_ORIGINS is a comma-separated list of allowed origins ("*" by default).
+# Credentials are only allowed with an explicit list: browsers reject them
+# for a wildcard, and a wildcard lets the middleware send a fixed header
+# instead of echoing each request's Origin.
+cors_origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
+    allow_origins=cors_origins,
+    allow_credentials="*" not in cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 # Include routers
@@ -38,19 +109,6 @@ app.include_router(tasks.router)
 app.include_router(webhooks.router)
 
 
-@app.on_event("startup")
-async def startup_event():
-    # Create database tables (in production, use Alembic migrations instead)
-    # async with async_engine.begin() as conn:
-    #     await conn.run_sync(Base.metadata.create_all)
-    pass
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    await async_engine.dispose()
-
-
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -61,11 +119,18 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# Internal error details are only returned to clients with DEBUG enabled
+EXPOSE_ERRORS = os.getenv("DEBUG", "false").lower() in ("1", "true")
+_INTERNAL_ERROR_BODY = orjson.dumps({"detail": "Internal server error"})
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal server error", "error": str(exc)}
-    )
+    if EXPOSE_ERRORS:
+        return ORJSONResponse(
+            status_code=500,
+            content={"detail": "Internal server error", "error": str(exc)}
+        )
+    return Response(content=_INTERNAL_ERROR_BODY, status_code=500, media_type="application/json")
 
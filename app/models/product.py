@@ -1,23 +1,28 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index, Computed
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Serves the product list: optional active filter, newest (highest id)
+        # first, and keyset pages via id < cursor. Replaces the single-column
+        # index on active.
+        Index("ix_products_active_id", "active", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)  # The primary key index already covers id
     name = Column(String(255), nullable=False, index=True)
     sku = Column(String(255), nullable=False, index=True)
+    # Lowercased SKU maintained by PostgreSQL (GENERATED ALWAYS AS ... STORED);
+    # backs the case-insensitive unique index ix_products_sku_lower
+    sku_lower = Column(Text, Computed("lower(sku)", persisted=True), index=True, unique=True)
     description = Column(Text, nullable=True)
-    active = Column(Boolean, default=True, nullable=False, index=True)
+    active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Case-insensitive unique index on SKU
-    # Note: The actual case-insensitive unique constraint will be created via Alembic migration
-    # using a functional index: CREATE UNIQUE INDEX ix_products_sku_lower ON products (LOWER(sku));
-
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', sku='{self.sku}')>"
 
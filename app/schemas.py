@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Literal, get_args
 from datetime import datetime
 
 
@@ -27,27 +27,20 @@ class ProductResponse(ProductBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Webhook Schemas
+# Validated by pydantic-core itself (no Python validator per instance)
+EventType = Literal['product.created', 'product.updated', 'product.deleted']
+VALID_EVENTS: frozenset[str] = frozenset(get_args(EventType))
+
+
 class WebhookBase(BaseModel):
     url: str = Field(..., max_length=512, description="Webhook URL")
-    event_types: List[str] = Field(..., description="List of event types to trigger webhook")
+    event_types: List[EventType] = Field(..., min_length=1, description="List of event types to trigger webhook")
     enabled: bool = Field(True, description="Whether the webhook is enabled")
 
-    @field_validator('event_types')
-    @classmethod
-    def validate_event_types(cls, v):
-        valid_events = {'product.created', 'product.updated', 'product.deleted'}
-        if not v:
-            raise ValueError("event_types cannot be empty")
-        invalid_events = set(v) - valid_events
-        if invalid_events:
-            raise ValueError(f"Invalid event types: {invalid_events}. Valid types: {valid_events}")
-        return v
-
 
 class WebhookCreate(WebhookBase):
     pass
@@ -55,29 +48,16 @@ class WebhookCreate(WebhookBase):
 
 class WebhookUpdate(BaseModel):
     url: Optional[str] = Field(None, max_length=512)
-    event_types: Optional[List[str]] = None
+    event_types: Optional[List[EventType]] = Field(None, min_length=1)
     enabled: Optional[bool] = None
 
-    @field_validator('event_types')
-    @classmethod
-    def validate_event_types(cls, v):
-        if v is not None:
-            valid_events = {'product.created', 'product.updated', 'product.deleted'}
-            if not v:
-                raise ValueError("event_types cannot be empty")
-            invalid_events = set(v) - valid_events
-            if invalid_events:
-                raise ValueError(f"Invalid event types: {invalid_events}. Valid types: {valid_events}")
-        return v
-
 
 class WebhookResponse(WebhookBase):
     id: int
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Pagination Schemas
@@ -92,6 +72,7 @@ class ProductListResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[int] = None  # Pass as ?cursor= to fetch the following page by keyset
 
 
 # Task Progress Schemas
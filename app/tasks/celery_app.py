@@ -1,36 +1,32 @@
 from celery import Celery
+from celery.signals import worker_process_init
+import logging
 import os
 from dotenv import load_dotenv
 from ssl import CERT_NONE
+from app.utils.redis_url import normalize_redis_url
+from app.database import sync_engine
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Celery configuration
 celery_broker_url = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 celery_result_backend = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 
-# Upstash Redis requires TLS - convert redis:// to rediss://
-# Also remove any trailing slashes or database numbers that might cause issues
-# Add SSL parameters to URL for Kombu compatibility
+# Upstash Redis requires TLS - convert redis:// to rediss:// and drop the
+# database path (Upstash only serves database 0)
+# Update environment variables so Celery (and start_worker.py) read the converted URLs
 if celery_broker_url and "upstash.io" in celery_broker_url:
-    # Remove trailing slashes and database numbers
-    celery_broker_url = celery_broker_url.rstrip('/').rstrip('/0').rstrip('/1').rstrip('/2')
-    # Convert to TLS
-    if celery_broker_url.startswith("redis://"):
-        celery_broker_url = celery_broker_url.replace("redis://", "rediss://", 1)
-    # Update environment variable so Celery reads the converted URL
+    celery_broker_url = normalize_redis_url(celery_broker_url)
     os.environ["CELERY_BROKER_URL"] = celery_broker_url
-    print(f"[Celery] Broker URL converted to: {celery_broker_url[:50]}...")
+    logger.debug("Broker URL converted to: %s...", celery_broker_url[:50])
 
 if celery_result_backend and "upstash.io" in celery_result_backend:
-    # Remove trailing slashes and database numbers
-    celery_result_backend = celery_result_backend.rstrip('/').rstrip('/0').rstrip('/1').rstrip('/2')
-    # Convert to TLS
-    if celery_result_backend.startswith("redis://"):
-        celery_result_backend = celery_result_backend.replace("redis://", "rediss://", 1)
-    # Update environment variable so Celery reads the converted URL
+    celery_result_backend = normalize_redis_url(celery_result_backend)
     os.environ["CELERY_RESULT_BACKEND"] = celery_result_backend
-    print(f"[Celery] Result backend converted to: {celery_result_backend[:50]}...")
+    logger.debug("Result backend converted to: %s...", celery_result_backend[:50])
 
 # Create Celery app with converted URLs
 celery_app = Celery(
@@ -103,6 +99,19 @@ celery_app.conf.update(**config_updates)
 # These will be used automatically when connections are established
 # No need to purge - connections are lazy-loaded and will use the SSL options
 
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    """
+    Give each prefork child its own sync engine pool.
+    
+    Tasks borrow connections from sync_engine's pool (held for the life of the
+    process); connections inherited from the parent across fork() must not be
+    shared, so they are dropped without being closed on the parent's behalf.
+    """
+    sync_engine.dispose(close=False)
+
+
 # Import tasks to register them
-from app.tasks import csv_import, csv_chunk_import, csv_chunk_processor  # noqa
+from app.tasks import csv_import, csv_chunk_processor  # noqa
 
@@ -1,88 +1,92 @@
 from app.tasks.celery_app import celery_app
-from app.utils.csv_parser import parse_csv_file_streaming, validate_product_row, normalize_sku
-from sqlalchemy import create_engine, select, func
-from sqlalchemy.orm import sessionmaker
-from app.database import DATABASE_URL_SYNC, SessionLocal
-from app.models.product import Product
-import redis
+from app.utils.csv_parser import (
+    parse_csv_file_streaming, validate_product_row, normalize_sku, open_csv_file, sniff_delimiter
+)
+from app.database import sync_engine
+from app.utils.bulk_upsert import copy_upsert_products
+from app.tasks.progress import redis_client, update_progress
+from app.utils.progress_store import MAX_STORED_ERRORS
+from app.utils.upload_storage import is_remote, fetch_upload, delete_upload
+from app.utils.product_cache import PRODUCT_CACHE_EPOCH_KEY
+from collections import deque
+from redis.exceptions import RedisError
+import logging
 import os
-import json
+import tempfile
 import csv
-import io
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Redis connection for progress tracking
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-# Convert to TLS for Upstash
-if redis_url and "upstash.io" in redis_url:
-    redis_url = redis_url.rstrip('/').rstrip('/0').rstrip('/1').rstrip('/2')
-    if redis_url.startswith("redis://"):
-        redis_url = redis_url.replace("redis://", "rediss://", 1)
-redis_client = redis.from_url(redis_url, decode_responses=True, ssl_cert_reqs=None)
+logger = logging.getLogger(__name__)
 
-# Batch size for database operations
-BATCH_SIZE = 50  # Larger batches = fewer commits = better performance
+# Rows per COPY upsert (one round-trip and one commit per batch)
+BATCH_SIZE = 1000
 
+# Minimum seconds between progress writes to Redis while rows are processed
+PROGRESS_FLUSH_INTERVAL = 0.25
+
+# Block size for the raw newline scan in estimate_csv_rows
+ESTIMATE_READ_SIZE = 1024 * 1024
 
-def update_progress(task_id: str, **kwargs):
-    """Update task progress in Redis."""
-    progress_key = f"task_progress:{task_id}"
-    
-    # Get existing progress or create new
-    existing = redis_client.get(progress_key)
-    if existing:
-        progress = json.loads(existing)
-    else:
-        progress = {
-            "task_id": task_id,
-            "status": "processing",
-            "progress": 0.0,
-            "total_rows": 0,
-            "processed_rows": 0,
-            "successful_rows": 0,
-            "failed_rows": 0,
-            "errors": [],
-            "created_at": datetime.utcnow().isoformat(),
-        }
-    
-    # Update with new values
-    progress.update(kwargs)
-    
-    # Calculate progress percentage
-    if progress.get("total_rows", 0) > 0:
-        progress["progress"] = (progress["processed_rows"] / progress["total_rows"]) * 100.0
-    
-    # Save to Redis
-    redis_client.setex(progress_key, 3600, json.dumps(progress))  # Expire after 1 hour
+
+def _invalidate_product_cache():
+    """Invalidate cached API product responses once a batch is committed."""
+    try:
+        redis_client.incr(PRODUCT_CACHE_EPOCH_KEY)
+    except RedisError as e:
+        # Stale entries expire on their own after PRODUCT_CACHE_TTL_SECONDS
+        logger.warning("Product cache invalidation failed: %s", e)
 
 
-def count_csv_rows(file_content: bytes, stop_after: int | None = None) -> int:
+def count_csv_rows(file_path: str, stop_after: int | None = None) -> int:
     """
     Count CSV data rows (excluding header). If stop_after is provided, stop counting
     once the number of data rows exceeds the threshold (useful for inline processing checks).
     """
-    text_content = file_content.decode('utf-8', errors='ignore')
-    text_content = text_content.replace('\r\n', '\n').replace('\r', '\n')
-    
-    first_line = text_content.split('\n')[0] if '\n' in text_content else text_content
-    delimiter = ',' if ',' in first_line else ('\t' if '\t' in first_line else ',')
-    
-    reader = csv.reader(io.StringIO(text_content), delimiter=delimiter)
     row_count = 0
-    for _ in reader:
-        row_count += 1
-        if stop_after is not None and (row_count - 1) >= stop_after:
-            break
+    with open_csv_file(file_path, errors='ignore') as stream:
+        delimiter = sniff_delimiter(stream)
+        
+        reader = csv.reader(stream, delimiter=delimiter)
+        for _ in reader:
+            row_count += 1
+            if stop_after is not None and (row_count - 1) >= stop_after:
+                break
     data_rows = max(row_count - 1, 0)
     return data_rows
 
 
-def _process_csv_import_core(task_id: str, file_content: bytes, filename: str, celery_task_id: str | None = None):
+def estimate_csv_rows(file_path: str) -> int:
+    """
+    Estimate CSV data rows (excluding header) by counting newlines in the raw bytes.
+    
+    Much cheaper than count_csv_rows on large files since nothing is decoded or
+    tokenized, but quoted fields containing newlines are over-counted. Good enough
+    for progress reporting; the import raises the total if it turns out low.
+    """
+    line_count = 0
+    last_block = b''
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(ESTIMATE_READ_SIZE)
+            if not block:
+                break
+            line_count += block.count(b'\n')
+            last_block = block
+    if last_block and not last_block.endswith(b'\n'):
+        line_count += 1  # Final line without a trailing newline
+    return max(line_count - 1, 0)
+
+
+def _process_csv_import_core(task_id: str, file_path: str, filename: str, celery_task_id: str | None = None):
     """
     Core CSV import logic shared by both Celery task and inline processing.
+    
+    Streams rows from the uploaded file at file_path and removes the file
+    once the import finishes (successfully or not).
     """
     try:
         update_progress(
@@ -92,118 +96,85 @@ def _process_csv_import_core(task_id: str, file_content: bytes, filename: str, c
             celery_task_id=celery_task_id
         )
         
-        estimated_total = max(count_csv_rows(file_content), 1)
+        estimated_total = max(estimate_csv_rows(file_path), 1)
         update_progress(
             task_id,
             total_rows=estimated_total,
             message=f"Processing approximately {estimated_total} rows..."
         )
         
-        db = SessionLocal()
+        # Upserts go through psycopg2 directly (COPY into a staging table, then
+        # one INSERT ... ON CONFLICT per batch) instead of ORM objects, so the
+        # existing catalogue never has to be loaded into memory
+        conn = sync_engine.raw_connection()
         try:
-            update_progress(task_id, message="Loading existing products...")
-            existing_products = db.query(Product).all()
-            existing_by_sku = {normalize_sku(p.sku): p for p in existing_products}
-            update_progress(task_id, message=f"Found {len(existing_by_sku)} existing products. Processing CSV...")
+            cur = conn.cursor()
             
             processed_rows = 0
             successful_rows = 0
             failed_rows = 0
-            errors = []
-            to_create = []
-            to_update = []
+            # Only the most recent errors are reported, so only those are kept
+            errors = deque(maxlen=MAX_STORED_ERRORS)
+            # Errors not yet written to Redis
+            unflushed_errors = deque(maxlen=10)
+            # Lowercased SKU -> (name, sku, description); the last occurrence
+            # of a SKU in a batch wins, exactly like a later upsert would
+            batch = {}
             actual_total = 0
+            last_flush = time.monotonic()
             
-            for row_data in parse_csv_file_streaming(file_content):
+            for row_data in parse_csv_file_streaming(file_path):
                 actual_total += 1
-                
-                if actual_total > estimated_total:
-                    estimated_total = actual_total
-                    update_progress(task_id, total_rows=estimated_total)
+                processed_rows += 1
                 
                 try:
                     is_valid, error_msg = validate_product_row(row_data)
-                    if not is_valid:
+                    if is_valid:
+                        batch[normalize_sku(row_data['sku'])] = (
+                            row_data['name'],
+                            row_data['sku'],
+                            row_data.get('description'),
+                        )
+                        successful_rows += 1
+                    else:
                         failed_rows += 1
                         errors.append(f"Row {row_data['row_number']}: {error_msg}")
-                        processed_rows += 1
-                        if processed_rows % 5 == 0 or processed_rows == estimated_total:
-                            update_progress(
-                                task_id,
-                                processed_rows=processed_rows,
-                                successful_rows=successful_rows,
-                                failed_rows=failed_rows,
-                                total_rows=estimated_total,
-                                message=f"Processed {processed_rows}/{estimated_total} rows..."
-                            )
-                        continue
-                    
-                    normalized_sku = normalize_sku(row_data['sku'])
-                    existing = existing_by_sku.get(normalized_sku)
-                    
-                    if existing:
-                        existing.name = row_data['name']
-                        existing.sku = row_data['sku']
-                        existing.description = row_data.get('description')
-                        existing.active = True
-                        to_update.append(existing)
-                    else:
-                        new_product = Product(
-                            name=row_data['name'],
-                            sku=row_data['sku'],
-                            description=row_data.get('description'),
-                            active=True
-                        )
-                        to_create.append(new_product)
-                        existing_by_sku[normalized_sku] = new_product
-                    
-                    successful_rows += 1
-                    processed_rows += 1
-                    
-                    if len(to_create) >= BATCH_SIZE:
-                        db.add_all(to_create)
-                        db.commit()
-                        to_create = []
-                    
-                    if len(to_update) >= BATCH_SIZE:
-                        db.commit()
-                        to_update = []
-                    
-                    update_interval = 5 if estimated_total < 100 else 10
-                    if processed_rows % update_interval == 0 or processed_rows == actual_total:
-                        update_progress(
-                            task_id,
-                            processed_rows=processed_rows,
-                            successful_rows=successful_rows,
-                            failed_rows=failed_rows,
-                            total_rows=estimated_total,
-                            errors=errors[-10:] if errors else [],
-                            message=f"Processed {processed_rows}/{estimated_total} rows..."
-                        )
+                        unflushed_errors.append(errors[-1])
                 
                 except Exception as e:
                     failed_rows += 1
-                    error_msg = f"Row {row_data.get('row_number', 'unknown')}: {str(e)}"
-                    errors.append(error_msg)
-                    processed_rows += 1
-                    if processed_rows % 5 == 0 or processed_rows == estimated_total:
-                        update_progress(
-                            task_id,
-                            processed_rows=processed_rows,
-                            successful_rows=successful_rows,
-                            failed_rows=failed_rows,
-                            total_rows=estimated_total,
-                            message=f"Processed {processed_rows}/{estimated_total} rows..."
-                        )
-                    continue
-            
-            if actual_total != estimated_total:
-                update_progress(task_id, total_rows=actual_total)
+                    errors.append(f"Row {row_data.get('row_number', 'unknown')}: {str(e)}")
+                    unflushed_errors.append(errors[-1])
+                
+                # Outside the per-row try: a failed batch fails the import
+                # rather than being blamed on a single row
+                if len(batch) >= BATCH_SIZE:
+                    copy_upsert_products(cur, batch.values())
+                    conn.commit()
+                    _invalidate_product_cache()
+                    batch = {}
+                
+                # Counters are kept in memory and written at most a few times a
+                # second (the UI polls about once a second anyway)
+                now = time.monotonic()
+                if now - last_flush >= PROGRESS_FLUSH_INTERVAL:
+                    estimated_total = max(estimated_total, actual_total)
+                    update_progress(
+                        task_id,
+                        processed_rows=processed_rows,
+                        successful_rows=successful_rows,
+                        failed_rows=failed_rows,
+                        total_rows=estimated_total,
+                        append_errors=unflushed_errors,
+                        message=f"Processed {processed_rows}/{estimated_total} rows..."
+                    )
+                    unflushed_errors.clear()
+                    last_flush = now
             
-            if to_create:
-                db.add_all(to_create)
-            if to_create or to_update:
-                db.commit()
+            if batch:
+                copy_upsert_products(cur, batch.values())
+                conn.commit()
+                _invalidate_product_cache()
             
             update_progress(
                 task_id,
@@ -212,9 +183,8 @@ def _process_csv_import_core(task_id: str, file_content: bytes, filename: str, c
                 successful_rows=successful_rows,
                 failed_rows=failed_rows,
                 total_rows=actual_total,
-                errors=errors[-20:] if errors else [],
+                errors=list(errors),
                 message=f"Import completed. {successful_rows} successful, {failed_rows} failed.",
-                progress=100.0,
                 completed_at=datetime.utcnow().isoformat()
             )
             
@@ -223,30 +193,68 @@ def _process_csv_import_core(task_id: str, file_content: bytes, filename: str, c
                 "total_rows": actual_total,
                 "successful_rows": successful_rows,
                 "failed_rows": failed_rows,
-                "errors": errors[-20:] if errors else []
+                "errors": list(errors)
             }
         
         finally:
-            db.close()
+            conn.close()  # Returns the connection to the pool (rolling back if needed)
     
     except Exception as e:
         update_progress(
             task_id,
             status="failed",
             message=f"Import failed: {str(e)}",
-            progress=100.0,
             completed_at=datetime.utcnow().isoformat(),
             errors=[str(e)]
         )
         raise
+    
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
 
 
 @celery_app.task(bind=True, ignore_result=True)
-def process_csv_import(self, task_id: str, file_content: bytes, filename: str):
-    """Celery task entrypoint."""
-    return _process_csv_import_core(task_id, file_content, filename, celery_task_id=self.request.id)
+def process_csv_import(self, task_id: str, file_ref: str, filename: str):
+    """
+    Celery task entrypoint.
+    
+    file_ref is a gs:// upload reference (see app.utils.upload_storage), or a
+    local path when the web service shares this worker's filesystem. Objects
+    are downloaded to a worker-local temp file, streamed from there, and
+    deleted from the bucket once the import ends (successfully or not).
+    """
+    if not is_remote(file_ref):
+        return _process_csv_import_core(task_id, file_ref, filename, celery_task_id=self.request.id)
+    
+    try:
+        fd, file_path = tempfile.mkstemp(prefix="import_", suffix=".csv")
+        os.close(fd)
+        try:
+            fetch_upload(file_ref, file_path)
+        except Exception as e:
+            os.remove(file_path)
+            update_progress(
+                task_id,
+                status="failed",
+                message=f"Import failed: could not read upload: {str(e)}",
+                completed_at=datetime.utcnow().isoformat(),
+                errors=[str(e)]
+            )
+            raise
+        
+        # Removes file_path when done
+        return _process_csv_import_core(task_id, file_path, filename, celery_task_id=self.request.id)
+    finally:
+        try:
+            delete_upload(file_ref)
+        except Exception as e:
+            # The bucket's lifecycle rule cleans up anything left behind
+            logger.warning("Failed to delete upload %s: %s", file_ref, e)
 
 
-def process_csv_import_inline(task_id: str, file_content: bytes, filename: str):
+def process_csv_import_inline(task_id: str, file_path: str, filename: str):
     """Inline processing entrypoint (bypasses Celery)."""
-    return _process_csv_import_core(task_id, file_content, filename, celery_task_id=None)
+    return _process_csv_import_core(task_id, file_path, filename, celery_task_id=None)
@@ -0,0 +1,56 @@
+import os
+import redis
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+from app.utils.progress_store import queue_progress_update
+from app.utils.redis_url import normalize_redis_url, redis_ssl_options
+
+load_dotenv()
+
+# Redis connection for progress tracking, shared by the import tasks in a
+# worker process. Keepalive and health checks keep the (TLS, on Upstash)
+# connections usable between bursts of progress updates instead of
+# reconnecting. redis-py resets the pool automatically after fork().
+# Convert to TLS for Upstash
+redis_url = normalize_redis_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+redis_pool = redis.ConnectionPool.from_url(
+    redis_url,
+    max_connections=32,
+    socket_keepalive=True,
+    health_check_interval=30,
+    decode_responses=True,  # Must be set on the pool, not on Redis()
+    **redis_ssl_options(redis_url),
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+
+def update_progress(
+    task_id: str,
+    increments: Optional[Dict[str, int]] = None,
+    errors: Optional[List[str]] = None,
+    append_errors: Optional[List[str]] = None,
+    **fields
+) -> list:
+    """
+    Update task progress in Redis in one atomic round-trip.
+    
+    Args:
+        task_id: Task identifier
+        increments: Counter fields to add to (e.g. successful_rows)
+        errors: Replace the stored errors with these
+        append_errors: Add these to the stored errors
+        **fields: Fields to set (status, message, total_rows, ...)
+    
+    Returns:
+        Pipeline results (HINCRBY results give the new counter values)
+    """
+    with redis_client.pipeline(transaction=True) as pipe:
+        queue_progress_update(
+            pipe,
+            task_id,
+            fields=fields,
+            increments=increments,
+            errors=errors,
+            append_errors=append_errors,
+        )
+        return pipe.execute()
@@ -0,0 +1,74 @@
+import csv
+import io
+from typing import Iterable, Optional, Tuple
+
+
+def copy_upsert_products(cursor, rows: Iterable[Tuple[str, str, Optional[str]]]) -> Tuple[int, int]:
+    """
+    Upsert products in one server-side statement using COPY into a staging table.
+
+    Rows are streamed into a temp table with COPY (one round-trip, no per-row
+    parse/plan), then merged into products with a single INSERT ... ON CONFLICT
+    against the generated sku_lower column's unique index. The staging table is
+    dropped when the caller commits.
+
+    The transaction is committed with synchronous_commit off, so COMMIT doesn't
+    wait for the WAL flush. A database crash can lose the last few hundred
+    milliseconds of committed batches (never corrupt them); imports are
+    idempotent upserts, so re-uploading the file recovers them.
+
+    Args:
+        cursor: psycopg2 cursor inside an open transaction
+        rows: (name, sku, description) tuples; SKUs must be unique case-insensitively
+
+    Returns:
+        Tuple of (created, updated) counts; unchanged existing rows count as neither
+    """
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    if not buf.tell():
+        return 0, 0
+    buf.seek(0)
+
+    cursor.execute("SET LOCAL synchronous_commit TO off")
+    cursor.execute("""
+        CREATE TEMP TABLE _product_stage (
+            name text,
+            sku text,
+            description text
+        ) ON COMMIT DROP
+    """)
+    cursor.copy_expert(
+        "COPY _product_stage (name, sku, description) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+
+    # Staged SKUs are already unique, so ON CONFLICT never has to touch the
+    # same row twice in one statement. Rows whose values are unchanged are
+    # skipped by the WHERE clause, so re-importing a catalogue doesn't write
+    # a new tuple version (and index entries) for every existing product.
+    cursor.execute("""
+        INSERT INTO products (name, sku, description, active)
+        SELECT name, sku, description, TRUE
+        FROM _product_stage
+        ON CONFLICT (sku_lower) DO UPDATE
+        SET name = EXCLUDED.name,
+            sku = EXCLUDED.sku,
+            description = EXCLUDED.description,
+            active = TRUE,
+            updated_at = NOW()
+        WHERE (products.name, products.sku, products.description, products.active)
+            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.sku, EXCLUDED.description, EXCLUDED.active)
+        RETURNING (xmax = 0) AS inserted
+    """)
+
+    # xmax is 0 only for freshly inserted tuples, so RETURNING tells us which
+    # SKUs were new without a separate lookup
+    created = 0
+    updated = 0
+    for (inserted,) in cursor.fetchall():
+        if inserted:
+            created += 1
+        else:
+            updated += 1
+    return created, updated
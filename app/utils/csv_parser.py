@@ -1,6 +1,6 @@
 import csv
-import io
-from typing import List, Dict, Tuple, Optional, Iterator
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Iterator, TextIO
 from app.models.product import Product
 
 
@@ -51,89 +51,164 @@ def detect_column_mapping(headers: List[str]) -> Dict[str, str]:
     return mapping
 
 
-def parse_csv_file_streaming(file_content: bytes, delimiter: str = None) -> Iterator[Dict[str, str]]:
+@lru_cache(maxsize=1024)
+def _mapping_for_headers(headers: Tuple[str, ...]) -> Dict[str, str]:
+    """Memoized detect_column_mapping keyed by the header tuple (treat result as read-only)."""
+    return detect_column_mapping(list(headers))
+
+
+def detect_delimiter(first_line: str) -> str:
+    """
+    Detect the CSV delimiter from the header line.
+    
+    Args:
+        first_line: First line of the CSV file
+    
+    Returns:
+        ',' or '\t' (defaults to comma)
+    """
+    if ',' in first_line:
+        return ','
+    if '\t' in first_line:
+        return '\t'
+    return ','  # Default to comma
+
+
+# Characters read from the start of a file to sniff its delimiter
+DELIMITER_SAMPLE_SIZE = 4096
+
+# Delimiters csv.Sniffer may choose from
+SNIFF_DELIMITERS = ',\t;|'
+
+
+def sniff_delimiter(stream: TextIO) -> str:
+    """
+    Detect the CSV delimiter from a sample at the start of the stream.
+    
+    csv.Sniffer looks at several lines and understands quoting, so a delimiter
+    that only appears inside a quoted header doesn't fool it. Falls back to
+    detect_delimiter on the first line if the sample is inconclusive. The
+    stream is rewound to the start afterwards.
+    
+    Args:
+        stream: Text stream positioned at the start of the file
+    
+    Returns:
+        Delimiter character
+    """
+    sample = stream.read(DELIMITER_SAMPLE_SIZE)
+    stream.seek(0)
+    
+    # Don't let the sniffer see a line cut off by the sample size
+    if len(sample) == DELIMITER_SAMPLE_SIZE and '\n' in sample:
+        sample = sample[:sample.rindex('\n') + 1]
+    
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return detect_delimiter(sample.split('\n', 1)[0])
+
+
+def open_csv_file(file_path: str, errors: str = 'strict') -> TextIO:
+    """
+    Open a CSV file on disk for streaming reads.
+    
+    newline='' leaves line-ending handling (\r\n, \r) to the csv module,
+    so the file is never decoded or normalized as a whole.
+    
+    Args:
+        file_path: Path to the CSV file
+        errors: How to handle invalid UTF-8 (see open())
+    
+    Returns:
+        Text stream positioned at the start of the file
     """
-    Parse CSV file content as a generator (streaming) to avoid loading entire file into memory.
+    return open(file_path, 'r', encoding='utf-8', errors=errors, newline='')
+
+
+def parse_csv_file_streaming(file_path: str, delimiter: str = None) -> Iterator[Dict[str, str]]:
+    """
+    Parse a CSV file as a generator (streaming) to avoid loading entire file into memory.
     
     Accepts any column names and auto-detects the mapping.
     
     Args:
-        file_content: Bytes content of the CSV file
+        file_path: Path to the CSV file
         delimiter: CSV delimiter (None = auto-detect)
     
     Yields:
         Dictionary with keys: row_number, name, sku, description
     """
-    # Decode in chunks to avoid memory issues
-    text_content = file_content.decode('utf-8')
+    with open_csv_file(file_path) as stream:
+        # Auto-detect delimiter if not specified
+        if delimiter is None:
+            delimiter = sniff_delimiter(stream)
+        
+        yield from _iter_product_rows(csv.reader(stream, delimiter=delimiter))
+
+
+# Header names tried (after normalization) when detect_column_mapping finds no match
+FIELD_FALLBACK_HEADERS = {
+    'name': ['name', 'product name', 'product_name', 'title'],
+    'sku': ['sku', 'product_sku', 'product sku', 'code', 'product_code'],
+    'description': ['description', 'desc', 'details', 'detail'],
+}
+
+
+def resolve_field_headers(fieldnames: List[str]) -> Dict[str, str]:
+    """
+    Decide once per file which CSV header each product field is read from.
     
-    # Normalize line endings (handle Windows \r\n)
-    text_content = text_content.replace('\r\n', '\n').replace('\r', '\n')
+    Args:
+        fieldnames: Column names from the CSV header
+    
+    Returns:
+        Dictionary mapping field names (name, sku, description) to original headers
+    """
+    # Try mapped column first, then fallback to direct lookup
+    column_mapping = _mapping_for_headers(tuple(fieldnames))
+    normalized_headers = {h.strip().lower(): h for h in fieldnames}
     
-    # Auto-detect delimiter if not specified
-    if delimiter is None:
-        first_line = text_content.split('\n')[0] if '\n' in text_content else text_content
-        if ',' in first_line:
-            delimiter = ','
-        elif '\t' in first_line:
-            delimiter = '\t'
-        else:
-            delimiter = ','  # Default to comma
+    resolved = {}
+    for field, fallback_headers in FIELD_FALLBACK_HEADERS.items():
+        if field in column_mapping:
+            resolved[field] = column_mapping[field]
+            continue
+        for key in fallback_headers:
+            if key in normalized_headers:
+                resolved[field] = normalized_headers[key]
+                break
+    return resolved
+
+
+def _iter_product_rows(reader: Iterator[List[str]]) -> Iterator[Dict[str, str]]:
+    """Map rows from a csv.reader to product dictionaries, skipping incomplete rows."""
+    header = next(reader, None)
+    field_headers = resolve_field_headers(header) if header else {}
     
-    reader = csv.DictReader(io.StringIO(text_content), delimiter=delimiter)
+    # Resolve source columns to positions up front so each row is read by
+    # index from the plain list csv.reader yields, with no per-row dict
+    column_index = {h: i for i, h in enumerate(header or [])}
+    name_idx = column_index.get(field_headers.get('name'))
+    sku_idx = column_index.get(field_headers.get('sku'))
+    desc_idx = column_index.get(field_headers.get('description'))
     
-    # Get column mapping from headers
-    if reader.fieldnames:
-        column_mapping = detect_column_mapping(reader.fieldnames)
-    else:
-        column_mapping = {}
+    if name_idx is None or sku_idx is None:
+        return  # Every row would be missing a required field
     
     for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-        # Normalize keys (strip whitespace, lowercase)
-        normalized_row = {k.strip().lower(): (v.strip() if v else '') for k, v in row.items()}
-        
-        # Skip empty rows
-        if not any(normalized_row.values()):
-            continue
+        width = len(row)
+        name = row[name_idx].strip() if name_idx < width else ''
+        sku = row[sku_idx].strip() if sku_idx < width else ''
         
-        # Extract values using column mapping
-        name = None
-        sku = None
-        description = None
-        
-        # Try mapped column first, then fallback to direct lookup
-        if 'name' in column_mapping:
-            name = normalized_row.get(column_mapping['name'].strip().lower(), '').strip()
-        else:
-            # Fallback: try common variations
-            for key in ['name', 'product name', 'product_name', 'title']:
-                if key in normalized_row:
-                    name = normalized_row[key].strip()
-                    break
-        
-        if 'sku' in column_mapping:
-            sku = normalized_row.get(column_mapping['sku'].strip().lower(), '').strip()
-        else:
-            # Fallback: try common variations
-            for key in ['sku', 'product_sku', 'product sku', 'code', 'product_code']:
-                if key in normalized_row:
-                    sku = normalized_row[key].strip()
-                    break
-        
-        if 'description' in column_mapping:
-            desc_val = normalized_row.get(column_mapping['description'].strip().lower(), '').strip()
-            description = desc_val if desc_val else None
-        else:
-            # Fallback: try common variations
-            for key in ['description', 'desc', 'details', 'detail']:
-                if key in normalized_row:
-                    description = normalized_row[key].strip() or None
-                    break
-        
-        # Validate required fields
+        # Validate required fields (this also skips empty rows)
         if not name or not sku:
             continue  # Skip rows with missing required fields
         
+        description = None
+        if desc_idx is not None and desc_idx < width:
+            description = row[desc_idx].strip() or None
+        
         yield {
             'row_number': row_num,
             'name': name,
@@ -142,19 +217,19 @@ def parse_csv_file_streaming(file_content: bytes, delimiter: str = None) -> Iter
         }
 
 
-def parse_csv_file(file_content: bytes, delimiter: str = None) -> List[Dict[str, str]]:
+def parse_csv_file(file_path: str, delimiter: str = None) -> List[Dict[str, str]]:
     """
-    Parse CSV file content and return list of dictionaries.
+    Parse a CSV file and return list of dictionaries.
     For large files, use parse_csv_file_streaming instead.
     
     Args:
-        file_content: Bytes content of the CSV file
+        file_path: Path to the CSV file
         delimiter: CSV delimiter (None = auto-detect)
     
     Returns:
         List of dictionaries with keys: name, sku, description
     """
-    return list(parse_csv_file_streaming(file_content, delimiter))
+    return list(parse_csv_file_streaming(file_path, delimiter))
 
 
 def validate_product_row(row: Dict[str, str]) -> Tuple[bool, Optional[str]]:
@@ -0,0 +1,78 @@
+import os
+import logging
+from typing import Optional, Tuple
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from app.utils.redis_url import normalize_redis_url, redis_ssl_options
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Serialized GET /api/products/{id} bodies are cached in Redis, so every API
+# worker sees the same entries and invalidations
+PRODUCT_CACHE_TTL_SECONDS = int(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "30"))
+
+# Every product write (API or CSV import) increments this counter. Entries are
+# stored with the epoch they were read under and ignored once it has moved on,
+# so one INCR invalidates the whole cache without scanning keys.
+PRODUCT_CACHE_EPOCH_KEY = "products:cache_epoch"
+
+redis_url = normalize_redis_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+redis_client = aioredis.from_url(redis_url, **redis_ssl_options(redis_url))
+
+
+def _product_cache_key(product_id: int) -> str:
+    return f"products:by_id:{product_id}"
+
+
+async def get_cached_product(product_id: int) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """
+    Look up a cached product body and the current cache epoch in one round-trip.
+
+    Args:
+        product_id: Product ID
+
+    Returns:
+        Tuple of (JSON body or None on a miss, epoch to pass to cache_product;
+        None if Redis is unavailable and nothing should be cached)
+    """
+    if PRODUCT_CACHE_TTL_SECONDS <= 0:
+        return None, None
+    try:
+        epoch, cached = await redis_client.mget(PRODUCT_CACHE_EPOCH_KEY, _product_cache_key(product_id))
+    except RedisError as e:
+        logger.warning("Product cache read failed: %s", e)
+        return None, None
+
+    epoch = epoch or b"0"
+    if cached is not None:
+        cached_epoch, _, body = cached.partition(b"|")
+        if cached_epoch == epoch:
+            return body, epoch
+    return None, epoch
+
+
+async def cache_product(product_id: int, body: bytes, epoch: Optional[bytes]):
+    """
+    Store a product body read under epoch (as returned by get_cached_product).
+
+    If a write bumped the epoch after the read, the entry is already stale
+    and is never served.
+    """
+    if PRODUCT_CACHE_TTL_SECONDS <= 0 or epoch is None:
+        return
+    try:
+        await redis_client.setex(_product_cache_key(product_id), PRODUCT_CACHE_TTL_SECONDS, epoch + b"|" + body)
+    except RedisError as e:
+        logger.warning("Product cache write failed: %s", e)
+
+
+async def invalidate_product_cache():
+    """Invalidate every cached product (call after any product write)."""
+    try:
+        await redis_client.incr(PRODUCT_CACHE_EPOCH_KEY)
+    except RedisError as e:
+        # Stale entries expire on their own after PRODUCT_CACHE_TTL_SECONDS
+        logger.warning("Product cache invalidation failed: %s", e)
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Import progress is kept in Redis for an hour after the last update
+PROGRESS_TTL_SECONDS = 3600
+
+# Most recent row errors kept per task
+MAX_STORED_ERRORS = 20
+
+# Redis returns every hash field as a string; these are converted back to int
+_INT_FIELDS = (
+    "total_rows",
+    "processed_rows",
+    "successful_rows",
+    "failed_rows",
+)
+
+
+def progress_keys(task_id: str) -> Tuple[str, str]:
+    """
+    Redis keys holding a task's progress.
+
+    Args:
+        task_id: Task identifier
+
+    Returns:
+        Tuple of (hash key with scalar fields, list key with recent errors)
+    """
+    progress_key = f"task_progress:{task_id}"
+    return progress_key, f"{progress_key}:errors"
+
+
+def new_progress(task_id: str, **fields) -> Dict[str, Any]:
+    """
+    Initial hash fields for a new task.
+
+    Args:
+        task_id: Task identifier
+        **fields: Fields overriding the defaults
+
+    Returns:
+        Dictionary of hash fields
+    """
+    progress = {
+        "task_id": task_id,
+        "status": "processing",
+        "total_rows": 0,
+        "processed_rows": 0,
+        "successful_rows": 0,
+        "failed_rows": 0,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    progress.update(fields)
+    return progress
+
+
+def queue_progress_update(
+    pipe,
+    task_id: str,
+    fields: Optional[Dict[str, Any]] = None,
+    increments: Optional[Dict[str, int]] = None,
+    errors: Optional[List[str]] = None,
+    append_errors: Optional[Iterable[str]] = None,
+):
+    """
+    Queue a progress update on a Redis pipeline (redis-py sync or asyncio).
+
+    Run it in a transaction pipeline so the update is applied atomically in a
+    single round-trip. Counters use HINCRBY, so concurrent writers never
+    overwrite each other's totals.
+
+    Args:
+        pipe: Redis pipeline
+        task_id: Task identifier
+        fields: Hash fields to set (None values are skipped)
+        increments: Counter fields to add to
+        errors: Replace the stored errors with these
+        append_errors: Add these errors, keeping the most recent MAX_STORED_ERRORS
+    """
+    progress_key, errors_key = progress_keys(task_id)
+
+    mapping = {k: v for k, v in (fields or {}).items() if v is not None}
+    if mapping:
+        pipe.hset(progress_key, mapping=mapping)
+    for field, amount in (increments or {}).items():
+        pipe.hincrby(progress_key, field, amount)
+
+    if errors is not None:
+        pipe.delete(errors_key)
+        append_errors = errors
+    append_errors = list(append_errors or [])
+    if append_errors:
+        pipe.rpush(errors_key, *append_errors)
+        pipe.ltrim(errors_key, -MAX_STORED_ERRORS, -1)
+
+    pipe.expire(progress_key, PROGRESS_TTL_SECONDS)
+    pipe.expire(errors_key, PROGRESS_TTL_SECONDS)
+
+
+def queue_progress_read(pipe, task_id: str):
+    """Queue the two reads parse_progress needs (hash fields, then errors)."""
+    progress_key, errors_key = progress_keys(task_id)
+    pipe.hgetall(progress_key)
+    pipe.lrange(errors_key, 0, -1)
+
+
+def parse_progress(task_id: str, fields: Dict[str, str], errors: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Build a progress dictionary (TaskProgressResponse shape) from stored values.
+
+    Args:
+        task_id: Task identifier
+        fields: Result of HGETALL on the progress hash
+        errors: Result of LRANGE on the errors list
+
+    Returns:
+        Progress dictionary, or None if the task is unknown
+    """
+    if not fields:
+        return None
+
+    progress = dict(fields)
+    for field in _INT_FIELDS:
+        if field in progress:
+            progress[field] = int(progress[field])
+    progress.setdefault("task_id", task_id)
+    progress.setdefault("status", "processing")
+
+    # Percentage is derived on read instead of being rewritten on every update
+    total_rows = progress.get("total_rows", 0)
+    if progress["status"] in ("completed", "failed"):
+        progress["progress"] = 100.0
+    elif total_rows > 0:
+        progress["progress"] = min(100.0, (progress.get("processed_rows", 0) / total_rows) * 100.0)
+    else:
+        progress["progress"] = 0.0
+
+    progress["errors"] = list(errors)
+    return progress
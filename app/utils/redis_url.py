@@ -0,0 +1,34 @@
+from typing import Any, Dict
+from urllib.parse import urlparse, urlunparse
+
+
+def normalize_redis_url(url: str) -> str:
+    """
+    Normalize a Redis URL for the provider it points at.
+
+    Upstash only accepts TLS connections to database 0, so its URLs are
+    switched to rediss:// and any trailing slash or database number is
+    removed. Other URLs are returned unchanged.
+
+    Args:
+        url: Redis URL from the environment
+
+    Returns:
+        URL to hand to redis-py / Kombu
+    """
+    if not url or "upstash.io" not in url:
+        return url
+
+    parsed = urlparse(url)
+    scheme = "rediss" if parsed.scheme == "redis" else parsed.scheme
+    return urlunparse(parsed._replace(scheme=scheme, path=""))
+
+
+def redis_ssl_options(url: str) -> Dict[str, Any]:
+    """
+    redis-py client options for a (normalized) Redis URL.
+
+    Upstash uses certificates that aren't verified here; ssl_cert_reqs is
+    only accepted by TLS connections, so plain redis:// URLs get no options.
+    """
+    return {"ssl_cert_reqs": None} if url.startswith("rediss://") else {}
@@ -0,0 +1,85 @@
+import os
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# GCS bucket uploads are handed to the worker through. When unset, the worker
+# is given the local file path, which only works if both run on one filesystem
+# (local development); separate Cloud Run services must set this.
+UPLOAD_BUCKET = os.getenv("UPLOAD_BUCKET", "")
+
+GCS_SCHEME = "gs://"
+
+_CLIENT = None
+
+
+def _get_client():
+    """Return the shared GCS client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        # Only needed when UPLOAD_BUCKET is set, so don't import it up front
+        from google.cloud import storage
+        _CLIENT = storage.Client()
+    return _CLIENT
+
+
+def _split_ref(ref: str) -> Tuple[str, str]:
+    """Split gs://bucket/name into (bucket, name)."""
+    bucket, _, name = ref[len(GCS_SCHEME):].partition("/")
+    return bucket, name
+
+
+def is_remote(ref: str) -> bool:
+    """Whether an upload reference points at object storage rather than a local path."""
+    return ref.startswith(GCS_SCHEME)
+
+
+def store_upload(local_path: str, object_name: str) -> Optional[str]:
+    """
+    Copy an uploaded file to object storage so another service can read it.
+
+    Blocking (streams the file to GCS); call it off the event loop.
+
+    Args:
+        local_path: Path of the uploaded file
+        object_name: Object name inside UPLOAD_BUCKET
+
+    Returns:
+        gs:// reference to pass to the worker, or None if UPLOAD_BUCKET is unset
+    """
+    if not UPLOAD_BUCKET:
+        return None
+    blob = _get_client().bucket(UPLOAD_BUCKET).blob(object_name)
+    blob.upload_from_filename(local_path, content_type="text/csv")
+    return f"{GCS_SCHEME}{UPLOAD_BUCKET}/{object_name}"
+
+
+def fetch_upload(ref: str, local_path: str):
+    """
+    Download an upload from object storage to a local file.
+
+    The object is streamed to disk, never held in memory whole.
+
+    Args:
+        ref: gs:// reference returned by store_upload
+        local_path: Destination path
+    """
+    bucket, name = _split_ref(ref)
+    _get_client().bucket(bucket).blob(name).download_to_filename(local_path)
+
+
+def delete_upload(ref: str):
+    """
+    Delete an upload from object storage (missing objects are ignored).
+
+    Args:
+        ref: gs:// reference returned by store_upload
+    """
+    from google.api_core.exceptions import NotFound
+
+    bucket, name = _split_ref(ref)
+    try:
+        _get_client().bucket(bucket).blob(name).delete()
+    except NotFound:
+        pass
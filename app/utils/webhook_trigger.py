@@ -1,42 +1,150 @@
 import httpx
 import asyncio
-from typing import Dict, Any, Optional
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import logging
+import os
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select, cast
+from sqlalchemy.dialects.postgresql import JSONB
+from app.database import AsyncSessionLocal
 from app.models.webhook import Webhook
 from app.models.product import Product
+from app.schemas import VALID_EVENTS
+from app.utils.redis_url import normalize_redis_url, redis_ssl_options
 import json
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Subscribers per event are cached in Redis (shared by every API worker) so
+# product writes don't query the webhooks table; webhook CRUD invalidates
+WEBHOOK_CACHE_TTL_SECONDS = int(os.getenv("WEBHOOK_CACHE_TTL_SECONDS", "30"))
+
+redis_url = normalize_redis_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+redis_client = aioredis.from_url(redis_url, **redis_ssl_options(redis_url))
+
+
+# Shared HTTP client so webhook deliveries reuse pooled keep-alive connections
+# (and TLS sessions) instead of handshaking with every subscriber on every event
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared webhook HTTP client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=100),
+        )
+    return _CLIENT
+
+
+async def aclose():
+    """Close the shared webhook HTTP client (called on application shutdown)."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def product_payload(product: Product) -> Dict[str, Any]:
+    """
+    Snapshot a product's fields for a webhook payload.
+    
+    Taken before the request's session closes, so webhook delivery never
+    touches the ORM instance (which may already be deleted or detached).
+    """
+    return {
+        "id": product.id,
+        "name": product.name,
+        "sku": product.sku,
+        "description": product.description,
+        "active": product.active,
+        "created_at": product.created_at.isoformat() if product.created_at else None,
+        "updated_at": product.updated_at.isoformat() if product.updated_at else None,
+    }
+
+
+def _webhook_cache_key(event_type: str) -> str:
+    return f"webhooks:by_event:{event_type}"
+
+
+async def _load_event_webhooks(event_type: str) -> List[Tuple[int, str]]:
+    """Query enabled webhooks subscribed to event_type as (id, url) pairs."""
+    # The event filter runs in Postgres (jsonb containment) and only the
+    # columns needed to deliver are fetched
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Webhook.id, Webhook.url).where(
+                Webhook.enabled == True,
+                cast(Webhook.event_types, JSONB).contains([event_type])
+            )
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def get_event_webhooks(event_type: str) -> List[Tuple[int, str]]:
+    """
+    Enabled webhooks subscribed to event_type, cached in Redis.
+    
+    Falls back to the database if Redis is unavailable.
+    
+    Args:
+        event_type: Event type (product.created, product.updated, product.deleted)
+    
+    Returns:
+        List of (webhook_id, url) tuples
+    """
+    if WEBHOOK_CACHE_TTL_SECONDS <= 0:
+        return await _load_event_webhooks(event_type)
+    
+    cache_key = _webhook_cache_key(event_type)
+    try:
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return [tuple(w) for w in orjson.loads(cached)]
+    except RedisError as e:
+        logger.warning("Webhook cache read failed: %s", e)
+        return await _load_event_webhooks(event_type)
+    
+    webhooks = await _load_event_webhooks(event_type)
+    try:
+        await redis_client.setex(cache_key, WEBHOOK_CACHE_TTL_SECONDS, orjson.dumps(webhooks))
+    except RedisError as e:
+        logger.warning("Webhook cache write failed: %s", e)
+    return webhooks
+
+
+async def invalidate_webhook_cache():
+    """Drop cached subscriber lists (call after any webhook create/update/delete)."""
+    try:
+        await redis_client.delete(*(_webhook_cache_key(e) for e in VALID_EVENTS))
+    except RedisError as e:
+        # Stale lists expire on their own after WEBHOOK_CACHE_TTL_SECONDS
+        logger.warning("Webhook cache invalidation failed: %s", e)
+
 
 async def trigger_webhooks(
     event_type: str,
-    product: Product,
-    db: AsyncSession,
+    product_data: Dict[str, Any],
     test_data: Optional[Dict[str, Any]] = None
 ):
     """
     Trigger webhooks for a product event.
     
+    Meant to run after the response is sent (e.g. via FastAPI BackgroundTasks),
+    so it opens its own short-lived database session.
+    
     Args:
         event_type: Event type (product.created, product.updated, product.deleted)
-        product: Product instance
-        db: Database session
+        product_data: Product snapshot from product_payload()
         test_data: Optional test data (for testing webhooks)
     """
     # Get enabled webhooks that listen to this event type
-    result = await db.execute(
-        select(Webhook).where(
-            Webhook.enabled == True
-        )
-    )
-    webhooks = result.scalars().all()
-    
-    # Filter webhooks that listen to this event type
-    relevant_webhooks = [
-        w for w in webhooks
-        if event_type in w.event_types
-    ]
+    relevant_webhooks = await get_event_webhooks(event_type)
     
     if not relevant_webhooks:
         return
@@ -48,42 +156,35 @@ async def trigger_webhooks(
         payload = {
             "event": event_type,
             "timestamp": datetime.utcnow().isoformat(),
-            "data": {
-                "id": product.id,
-                "name": product.name,
-                "sku": product.sku,
-                "description": product.description,
-                "active": product.active,
-                "created_at": product.created_at.isoformat() if product.created_at else None,
-                "updated_at": product.updated_at.isoformat() if product.updated_at else None,
-            }
+            "data": product_data,
         }
     
+    client = get_http_client()
+    
     # Trigger webhooks asynchronously (fire and forget)
-    async def send_webhook(webhook: Webhook):
+    async def send_webhook(webhook_id: int, url: str):
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    webhook.url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                # Log response (in production, you might want to store this)
-                return {
-                    "webhook_id": webhook.id,
-                    "status_code": response.status_code,
-                    "success": 200 <= response.status_code < 300
-                }
+            response = await client.post(
+                url,
+                json=payload,
+                headers={"Content-Type": "application/json"}
+            )
+            # Log response (in production, you might want to store this)
+            return {
+                "webhook_id": webhook_id,
+                "status_code": response.status_code,
+                "success": 200 <= response.status_code < 300
+            }
         except Exception as e:
             # Log error (in production, you might want to store this)
             return {
-                "webhook_id": webhook.id,
+                "webhook_id": webhook_id,
                 "error": str(e),
                 "success": False
             }
     
     # Send all webhooks concurrently
-    tasks = [send_webhook(w) for w in relevant_webhooks]
+    tasks = [send_webhook(webhook_id, url) for webhook_id, url in relevant_webhooks]
     await asyncio.gather(*tasks, return_exceptions=True)
 
 
@@ -98,19 +199,18 @@ async def test_webhook(webhook: Webhook, test_data: Dict[str, Any]) -> Dict[str,
     
     start_time = time.time()
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                webhook.url,
-                json=test_data,
-                headers={"Content-Type": "application/json"}
-            )
-            response_time_ms = (time.time() - start_time) * 1000
-            
-            return {
-                "status_code": response.status_code,
-                "response_time_ms": round(response_time_ms, 2),
-                "success": 200 <= response.status_code < 300
-            }
+        response = await get_http_client().post(
+            webhook.url,
+            json=test_data,
+            headers={"Content-Type": "application/json"}
+        )
+        response_time_ms = (time.time() - start_time) * 1000
+        
+        return {
+            "status_code": response.status_code,
+            "response_time_ms": round(response_time_ms, 2),
+            "success": 200 <= response.status_code < 300
+        }
     except httpx.TimeoutException:
         response_time_ms = (time.time() - start_time) * 1000
         raise Exception(f"Webhook request timed out after {response_time_ms:.2f}ms")
@@ -6,18 +6,51 @@ import os
 import sys
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from socketserver import ThreadingMixIn
+
+
+def _json_response(status_line: bytes, body: bytes) -> bytes:
+    """Build a complete HTTP response (status line, headers and body)."""
+    return (
+        b"HTTP/1.0 " + status_line + b"\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+        b"\r\n" + body
+    )
+
+
+# Complete responses built once; probes get a single write with no per-request
+# status line or header formatting
+_HEALTH_RESPONSE = _json_response(b"200 OK", b'{"status": "healthy", "service": "celery-worker"}')
+_READY_RESPONSE = _json_response(b"200 OK", b'{"status": "ready", "service": "celery-worker"}')
+_NOT_READY_RESPONSE = _json_response(
+    b"503 Service Unavailable", b'{"status": "starting", "service": "celery-worker"}'
+)
+
+# Set once the Celery worker is connected to the broker and consuming
+_worker_ready = threading.Event()
+
+
+def mark_ready(**kwargs):
+    """Report the worker as ready on /ready (connect to Celery's worker_ready signal)."""
+    _worker_ready.set()
 
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
-    """Simple health check endpoint."""
+    """
+    Health check endpoints.
+    
+    /health (and /) report the process is alive as soon as the server binds;
+    /ready returns 503 until the Celery worker has started consuming.
+    """
+    
+    # Requests are served one at a time; don't let a stalled client block probes
+    timeout = 5
     
     def do_GET(self):
         if self.path == '/health' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status": "healthy", "service": "celery-worker"}')
+            self.wfile.write(_HEALTH_RESPONSE)
+        elif self.path == '/ready':
+            self.wfile.write(_READY_RESPONSE if _worker_ready.is_set() else _NOT_READY_RESPONSE)
         else:
             self.send_response(404)
             self.end_headers()
@@ -27,15 +60,15 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
         pass
 
 
-class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
-    """Threading HTTP server."""
-    daemon_threads = True
-
-
 def start_health_server(port=8080):
-    """Start HTTP health check server in a separate thread."""
+    """
+    Start HTTP health check server in a separate thread.
+    
+    The response is static and probes arrive every few seconds, so a single
+    serving thread handles them; no thread is spawned per request.
+    """
     try:
-        server = ThreadingHTTPServer(('0.0.0.0', port), HealthCheckHandler)
+        server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
         thread = threading.Thread(target=server.serve_forever, daemon=True)
         thread.start()
         print(f"Health server thread started, listening on 0.0.0.0:{port}")
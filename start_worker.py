@@ -4,82 +4,82 @@ Startup script for Celery worker with health check server.
 Runs both the health check HTTP server and Celery worker.
 """
 import os
-import subprocess
 import sys
-from app.worker_health import start_health_server
+import time
+from app.worker_health import start_health_server, mark_ready
+
+
+def _log(t0: float, message: str, file=sys.stdout):
+    """Print a startup milestone with the milliseconds elapsed since t0."""
+    print(f"[+{(time.monotonic() - t0) * 1000:.0f}ms] {message}", file=file, flush=True)
+
 
 def main():
+    # Startup milestones are logged relative to this, to profile cold starts
+    t0 = time.monotonic()
+    
     # Get port from environment (Cloud Run sets this)
     port = int(os.getenv("PORT", 8080))
     
+    # Worker child processes (each has its own DB and Redis pools)
+    concurrency = int(os.getenv("WORKER_CONCURRENCY", 2))
+    
+    # Start health check server in background thread before the (slow) app
+    # import, so Cloud Run's startup probe is answered right away. The socket
+    # is bound before start_health_server returns.
+    _log(t0, f"Starting health check server on port {port}...")
+    server = start_health_server(port)
+    _log(t0, f"Health check server listening on port {port}")
+    
     # Import celery_app to trigger URL conversion and environment variable updates
     # This ensures the converted URLs are set in os.environ before Celery starts
     # The import triggers the URL conversion code in celery_app.py
     try:
         from app.tasks.celery_app import celery_app  # noqa - triggers URL conversion
     except Exception as e:
-        print(f"ERROR: Failed to import celery_app: {e}", file=sys.stderr)
+        _log(t0, f"ERROR: Failed to import celery_app: {e}", file=sys.stderr)
         sys.exit(1)
+    _log(t0, "Imported celery_app")
+    
+    # Flip /ready once the worker is connected to the broker and consuming
+    from celery.signals import worker_ready
+    worker_ready.connect(mark_ready, weak=False)
     
     # Read the converted URLs from environment (they were set by celery_app.py)
     celery_broker_url = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     celery_result_backend = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
     
     if not celery_broker_url or not celery_result_backend:
-        print("ERROR: CELERY_BROKER_URL or CELERY_RESULT_BACKEND not set", file=sys.stderr)
+        _log(t0, "ERROR: CELERY_BROKER_URL or CELERY_RESULT_BACKEND not set", file=sys.stderr)
         sys.exit(1)
     
-    print(f"[Worker] Using broker: {celery_broker_url[:50]}...")
-    print(f"[Worker] Using backend: {celery_result_backend[:50]}...")
-    
-    # Start health check server in background thread
-    print(f"Starting health check server on port {port}...")
-    server = start_health_server(port)
-    
-    # Give health server a moment to start listening
-    import time
-    time.sleep(1)
-    print(f"Health check server started on port {port}")
+    _log(t0, f"[Worker] Using broker: {celery_broker_url[:50]}...")
+    _log(t0, f"[Worker] Using backend: {celery_result_backend[:50]}...")
     
     # Start Celery worker (this will block)
-    print("Starting Celery worker...")
-    celery_cmd = [
-        "celery",
-        "-A", "app.tasks.celery_app",
+    worker_argv = [
         "worker",
         "--loglevel=info",
-        "--concurrency=2",
         "--without-gossip",  # Disable gossip to reduce network overhead
         "--without-mingle",   # Disable mingle to reduce startup time
         "--without-heartbeat"  # Disable heartbeat to reduce network overhead
     ]
+    if concurrency == 1:
+        # Run tasks in this process: no forked child, no second copy of the app
+        worker_argv.append("--pool=solo")
+    else:
+        worker_argv += [
+            f"--concurrency={concurrency}",
+            "-Ofair",  # Hand tasks only to idle children (prefetch is 1 via celery_app config)
+        ]
+    _log(t0, "Starting Celery worker...")
     
-    # Run Celery worker - output directly to stdout/stderr so Cloud Run captures it
-    # Don't buffer output - we need to see errors immediately
-    import sys
-    sys.stdout.flush()
-    sys.stderr.flush()
-    
-    # Run worker with unbuffered output
-    # Use Popen so we can stream output in real-time
-    import subprocess
-    process = subprocess.Popen(
-        celery_cmd,
-        stdout=sys.stdout,
-        stderr=sys.stderr,
-        bufsize=0,  # Unbuffered
-        env=os.environ.copy()
-    )
-    
-    # Wait for process to complete
-    returncode = process.wait()
-    if returncode != 0:
-        print(f"ERROR: Celery worker exited with code {returncode}", file=sys.stderr)
-        sys.stderr.flush()
-        # Sleep a bit before exiting to allow health check to respond
-        import time
-        time.sleep(5)
-    sys.exit(returncode)
+    # Run the worker in this process rather than as a `celery` subprocess: the
+    # health check thread keeps serving from the same process, and there is no
+    # idle Python parent holding its own copy of the app. Output goes straight
+    # to stdout/stderr so Cloud Run captures it; worker_main exits via SystemExit.
+    celery_app.worker_main(worker_argv)
+
 
 if __name__ == "__main__":
     main()